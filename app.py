@@ -2,6 +2,10 @@ import sys
 import csv
 import os
 import re
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import chain, islice
 from typing import Dict, List, Optional
 
 try:
@@ -13,15 +17,16 @@ from PySide6.QtWidgets import (
     QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
     QPushButton, QLabel, QFileDialog, QMessageBox, QSplitter,
     QGroupBox, QGridLayout, QComboBox, QLineEdit, QCheckBox,
-    QTabWidget, QTextEdit, QTableWidget, QTableWidgetItem,
+    QTabWidget, QTextEdit, QTableView,
     QHeaderView, QProgressBar, QRadioButton, QStackedWidget
 )
-from PySide6.QtCore import Qt, QThread, Signal, QObject
+from PySide6.QtCore import Qt, QRunnable, QThreadPool, Signal, QObject, QAbstractTableModel, QModelIndex
 from PySide6.QtGui import QFont, QIntValidator, QCloseEvent
 
 from pii_utils import (
     detect_and_deidentify_record, get_preset_patterns,
-    get_available_presets, PII_HANDLERS, PATTERN_PRESETS
+    get_available_presets, build_pattern_set, compile_pattern,
+    get_compiled_preset, calculate_metrics, PII_HANDLERS, PATTERN_PRESETS
 )
 
 STYLESHEET = """
@@ -36,39 +41,88 @@ STYLESHEET = """
     QPushButton#Nav:hover { background-color: #357ABD; }
     QLabel { font-size: 10pt; background-color: transparent; color: #EAEAEA; }
     QLineEdit, QComboBox { font-size: 10pt; padding: 5px; border: 1px solid #555; border-radius: 4px; background-color: #2C2C2C; color: #EAEAEA; }
-    QTableWidget { border: 1px solid #3A3A3A; gridline-color: #505050; background-color: #1E1E1E; color: #EAEAEA; }
+    QTableView { border: 1px solid #3A3A3A; gridline-color: #505050; background-color: #1E1E1E; color: #EAEAEA; }
     QHeaderView::section { background-color: #333; padding: 4px; border: 1px solid #444; font-weight: bold; color: #EAEAEA; }
     QTabWidget::pane { border: 1px solid #3A3A3A; border-top: none; }
     QTabBar::tab { background: #2C2C2C; padding: 10px; border: 1px solid #444; border-bottom: none; border-top-left-radius: 4px; border-top-right-radius: 4px; color: #EAEAEA; }
     QTabBar::tab:selected { background: #1E1E1E; }
 """
 
+_POOL_CHUNK_ROWS = 2000
+_PROGRESS_EVERY_ROWS = 500
+_SAVE_BUFFER_BYTES = 1 << 20
+_READ_BUFFER_BYTES = 1 << 20
+
+def _process_chunk(rows, pattern_srcs, mask_configs):
+    """Scans one chunk of rows; runs in a pool worker, compiling patterns once per process."""
+    patterns = {key: compile_pattern(src, flags) for key, (src, flags) in pattern_srcs.items()}
+    pattern_set = build_pattern_set(patterns, mask_configs)
+    context, cache, deid_rows = {}, {}, []
+    counts = {key: 0 for key in PII_HANDLERS}
+    for row in rows:
+        deid_row, row_counts = detect_and_deidentify_record(row, patterns, mask_configs, context=context, pattern_set=pattern_set, cache=cache)
+        deid_rows.append(deid_row)
+        for key in counts: counts[key] += row_counts.get(key, 0)
+    return deid_rows, counts
+
+class DeidModel(QAbstractTableModel):
+    """Read-only model over the de-identified rows.
+
+    Holds the row list by reference and serves cells on demand from data(),
+    so populating the preview costs O(1) instead of one QTableWidgetItem
+    allocation per cell.
+    """
+    def __init__(self, headers: List[str], rows: List[List[str]], parent=None):
+        super().__init__(parent)
+        self._headers, self._rows = headers, rows
+
+    def rowCount(self, parent=QModelIndex()): return 0 if parent.isValid() else len(self._rows)
+    def columnCount(self, parent=QModelIndex()): return 0 if parent.isValid() else len(self._headers)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and index.isValid():
+            row = self._rows[index.row()]
+            return row[index.column()] if index.column() < len(row) else None
+        return None
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal and section < len(self._headers): return self._headers[section]
+        return super().headerData(section, orientation, role)
+
 class Worker(QObject):
     finished = Signal(object)
     error = Signal(str)
+    progress = Signal(int)
     def __init__(self, input_path, patterns, mask_configs, expected_counts):
         super().__init__()
         self.input_path, self.patterns, self.mask_configs, self.expected_counts = input_path, patterns, mask_configs, expected_counts
+        self.pattern_set = build_pattern_set(patterns, mask_configs)
         self._is_interrupted = False
 
     def run(self):
         try:
-            headers, input_rows = [], []
             file_ext = os.path.splitext(self.input_path)[1].lower()
-            if file_ext == '.csv': headers, input_rows = self._read_csv()
-            elif file_ext == '.txt': headers, input_rows = self._read_txt()
+            if file_ext == '.csv': row_iter = self._iter_csv()
+            elif file_ext == '.txt': row_iter = self._iter_txt()
             elif file_ext == '.pdf':
                 if fitz is None: raise ImportError("PyMuPDF is not installed. Please run 'pip install PyMuPDF' to process PDF files.")
-                headers, input_rows = self._read_pdf()
-            
-            run_context, deidentified_rows = {}, []
+                row_iter = self._iter_pdf()
+            else: row_iter = iter(())
+            headers = next(row_iter, [])
+
+            run_context, run_cache, deidentified_rows = {}, {}, []
             summary = {"rows_processed": 0, "matches": {key: 0 for key in PII_HANDLERS}}
-            for row in input_rows:
-                if self._is_interrupted: break
-                deid_row, row_counts = detect_and_deidentify_record(row, self.patterns, self.mask_configs, context=run_context)
-                deidentified_rows.append(deid_row); summary["rows_processed"] += 1
-                for key in summary["matches"]: summary["matches"][key] += row_counts.get(key, 0)
-            
+            head = list(islice(row_iter, _POOL_CHUNK_ROWS + 1))
+            if len(head) > _POOL_CHUNK_ROWS and (os.cpu_count() or 1) > 1:
+                self._run_parallel(chain(head, row_iter), deidentified_rows, summary)
+            else:
+                for row in chain(head, row_iter):
+                    if self._is_interrupted: break
+                    deid_row, row_counts = detect_and_deidentify_record(row, self.patterns, self.mask_configs, context=run_context, pattern_set=self.pattern_set, cache=run_cache)
+                    deidentified_rows.append(deid_row); summary["rows_processed"] += 1
+                    for key in summary["matches"]: summary["matches"][key] += row_counts.get(key, 0)
+                    if summary["rows_processed"] % _PROGRESS_EVERY_ROWS == 0: self.progress.emit(summary["rows_processed"])
+
             if not self._is_interrupted:
                 report_metrics = self._calculate_metrics(summary)
                 self.finished.emit((headers, deidentified_rows, summary, report_metrics))
@@ -77,42 +131,64 @@ class Worker(QObject):
 
     def stop(self): self._is_interrupted = True
 
+    def _run_parallel(self, row_iter, deidentified_rows, summary):
+        """Shards the row stream into chunks and scans them on all cores.
+
+        Chunks are submitted through a small in-flight window rather than
+        executor.map, which drains its input iterables eagerly: the window
+        keeps the file streaming (at most a few chunks alive at once),
+        results are collected in submission order so row order is kept, and
+        stop() takes effect between submissions instead of after the whole
+        file has been queued.
+        """
+        # (pattern, flags) pairs: dropping flags would recompile re.ASCII custom patterns as Unicode in the workers.
+        pattern_srcs = {key: (p.pattern, p.flags) for key, p in (self.patterns or {}).items()}
+        max_workers = os.cpu_count() or 1
+        window = max_workers + 2
+        pending = deque()
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            exhausted = False
+            while True:
+                while not exhausted and len(pending) < window and not self._is_interrupted:
+                    if chunk := list(islice(row_iter, _POOL_CHUNK_ROWS)):
+                        pending.append(executor.submit(_process_chunk, chunk, pattern_srcs, self.mask_configs))
+                    else: exhausted = True
+                if not pending or self._is_interrupted: break
+                deid_rows, counts = pending.popleft().result()
+                deidentified_rows.extend(deid_rows); summary["rows_processed"] += len(deid_rows)
+                for key in summary["matches"]: summary["matches"][key] += counts.get(key, 0)
+                self.progress.emit(summary["rows_processed"])
+            for future in pending: future.cancel()
+
     def _calculate_metrics(self, summary):
-        metrics = {}
-        for key in PII_HANDLERS.keys():
-            found = summary['matches'].get(key, 0)
-            expected = self.expected_counts.get(key, None)
-            tp = min(found, expected) if expected is not None else found
-            fp = max(0, found - expected) if expected is not None else 0
-            fn = max(0, expected - found) if expected is not None else 0
-            precision = tp / (tp + fp) if (tp + fp) > 0 else 0.0
-            recall = tp / (tp + fn) if (tp + fn) > 0 else 0.0
-            f1 = 2 * (precision * recall) / (precision + recall) if (precision + recall) > 0 else 0.0
-            risk_level = "N/A"
-            if expected is not None:
-                if tp == 0 and fp > 0: risk_level = "Critical"
-                elif tp > 0 and fp == 0: risk_level = "Low"
-                elif precision >= 0.8: risk_level = "Medium"
-                elif precision >= 0.5: risk_level = "High"
-                else: risk_level = "Critical"
-            metrics[key] = {"found": found, "expected": expected, "tp": tp, "fp": fp, "precision": precision, "recall": recall, "f1": f1, "risk": risk_level}
-        return metrics
-
-    def _read_csv(self):
-        with open(self.input_path, newline="", encoding="utf-8-sig") as f:
-            reader = csv.reader(f); headers = next(reader, []); rows = list(reader)
-        return headers, rows
-
-    def _read_txt(self):
-        with open(self.input_path, "r", encoding="utf-8") as f: rows = [[line.strip()] for line in f]
-        return ["Text"], rows
-    
-    def _read_pdf(self):
-        rows, doc = [], fitz.open(self.input_path)
-        for page in doc:
-            for line in page.get_text().splitlines():
-                if line.strip(): rows.append([line.strip()])
-        return ["Extracted Text"], rows
+        return calculate_metrics(summary, self.expected_counts)
+
+    def _iter_csv(self):
+        """Yields the header row first, then data rows lazily so only one row is alive at a time."""
+        with open(self.input_path, newline="", encoding="utf-8-sig", buffering=_READ_BUFFER_BYTES) as f:
+            reader = csv.reader(f); yield next(reader, []); yield from reader
+
+    def _iter_txt(self):
+        yield ["Text"]
+        with open(self.input_path, "r", encoding="utf-8", buffering=_READ_BUFFER_BYTES) as f:
+            for line in f: yield [line.strip()]
+
+    def _iter_pdf(self):
+        yield ["Extracted Text"]
+        with fitz.open(self.input_path) as doc:
+            for page in doc:
+                # "blocks" skips building one page-wide string; block[4] is the text, block[6] the type (0 = text).
+                for block in page.get_text("blocks"):
+                    if block[6] != 0: continue
+                    for line in map(str.strip, block[4].splitlines()):
+                        if line: yield [line]
+
+class WorkerRunnable(QRunnable):
+    """Thin QRunnable adapter so the Worker runs on the global QThreadPool instead of a dedicated QThread."""
+    def __init__(self, worker: Worker):
+        super().__init__()
+        self._worker = worker; self.setAutoDelete(True)
+    def run(self): self._worker.run()
 
 class PiiApp(QMainWindow):
     def __init__(self):
@@ -123,7 +199,7 @@ class PiiApp(QMainWindow):
         self.pii_types = list(PII_HANDLERS.keys())
         self.pii_labels = {"aadhaar": "Aadhaar", "pan": "PAN", "credit_card": "Credit Card", "email": "Email", "passport": "Passport", "driving_license": "Driving License", "phone": "Phone", "person": "Person Name"}
         self.mask_config_widgets: Dict[str, Dict] = {}; self.regex_widgets: Dict[str, QLineEdit] = {}; self.expected_count_widgets: Dict[str, QLineEdit] = {}
-        self.thread: Optional[QThread] = None; self.worker: Optional[Worker] = None
+        self.worker: Optional[Worker] = None; self._scan_running = False; self._last_progress_paint = 0.0
         self._init_ui()
 
     def _init_ui(self):
@@ -148,6 +224,7 @@ class PiiApp(QMainWindow):
         self.custom_regex_widgets = QWidget(); custom_layout = QGridLayout(self.custom_regex_widgets)
         for i, key in enumerate(self.pii_types):
             default_pattern = PATTERN_PRESETS["Indian (Default)"].get(key, ""); self.regex_widgets[key] = QLineEdit(default_pattern)
+            self.regex_widgets[key].textChanged.connect(lambda _, k=key: self._lint_regex(k))
             custom_layout.addWidget(QLabel(self.pii_labels.get(key, key.title())), i, 0); custom_layout.addWidget(self.regex_widgets[key], i, 1)
         self.custom_regex_widgets.setEnabled(False); regex_layout.addWidget(self.custom_regex_widgets); regex_page_layout.addWidget(regex_group)
         next_button = QPushButton("Next: Configure De-Identification →"); next_button.setObjectName("Nav"); next_button.clicked.connect(lambda: self.config_stack.setCurrentIndex(1))
@@ -168,7 +245,7 @@ class PiiApp(QMainWindow):
         self.config_stack.addWidget(regex_page); self.config_stack.addWidget(deid_page)
         right_pane = QWidget(); right_layout = QVBoxLayout(right_pane); splitter.addWidget(right_pane)
         self.tabs = QTabWidget(); self.summary_text = QTextEdit(); self.summary_text.setReadOnly(True); self.summary_text.setFont(QFont("Consolas", 10))
-        self.preview_table = QTableWidget(); self.tabs.addTab(self.summary_text, "Summary Report"); self.tabs.addTab(self.preview_table, "De-identified Data Preview")
+        self.preview_table = QTableView(); self.tabs.addTab(self.summary_text, "Summary Report"); self.tabs.addTab(self.preview_table, "De-identified Data Preview")
         right_layout.addWidget(self.tabs)
         bottom_layout = QHBoxLayout(); save_csv_button = QPushButton("Save De-Identified File"); save_summary_button = QPushButton("Save Summary Report")
         save_csv_button.clicked.connect(self._save_deidentified); save_summary_button.clicked.connect(self._save_summary)
@@ -187,16 +264,30 @@ class PiiApp(QMainWindow):
         if not self.input_path: QMessageBox.warning(self, "No File", "Please select an input file first."); return
         self.run_button.setEnabled(False); self.progress_bar.setVisible(True); self._clear_outputs()
         mask_configs = self._get_mask_configs(); patterns = self._compile_overrides(); expected_counts = self._get_expected_counts()
-        self.thread = QThread(); self.worker = Worker(self.input_path, patterns, mask_configs, expected_counts); self.worker.moveToThread(self.thread)
-        self.thread.started.connect(self.worker.run); self.worker.finished.connect(self._on_detection_complete)
-        self.worker.error.connect(self._on_detection_error); self.worker.finished.connect(self.thread.quit); self.worker.finished.connect(self.worker.deleteLater); self.thread.finished.connect(self.thread.deleteLater); self.thread.start()
+        self.worker = Worker(self.input_path, patterns, mask_configs, expected_counts)
+        self.worker.finished.connect(self._on_detection_complete); self.worker.progress.connect(self._on_progress); self.worker.error.connect(self._on_detection_error)
+        self._scan_running = True; QThreadPool.globalInstance().start(WorkerRunnable(self.worker))
 
     def _on_detection_complete(self, result):
         self.headers, self.deidentified_rows, self.summary, self.report_metrics = result
-        self._render_summary(); self._render_preview(); self.progress_bar.setVisible(False); self.run_button.setEnabled(True); QMessageBox.information(self, "Completed", "Detection and de-identification finished.")
+        self._scan_running = False
+        self.setUpdatesEnabled(False)  # repaint once after both panes are filled
+        try:
+            self._render_summary(); self._render_preview()
+        finally:
+            self.setUpdatesEnabled(True)
+        self.progress_bar.setVisible(False); self.run_button.setEnabled(True); self.statusBar().clearMessage(); QMessageBox.information(self, "Completed", "Detection and de-identification finished.")
+
+    def _on_progress(self, rows_processed):
+        # Queued progress signals can pile up faster than repaints; redraw at most every 100 ms.
+        now = time.monotonic()
+        if now - self._last_progress_paint >= 0.1:
+            self._last_progress_paint = now
+            self.statusBar().showMessage(f"{rows_processed:,} rows processed...")
 
     def _on_detection_error(self, err_msg):
-        QMessageBox.critical(self, "Error", err_msg); self.progress_bar.setVisible(False); self.run_button.setEnabled(True)
+        self._scan_running = False
+        QMessageBox.critical(self, "Error", err_msg); self.progress_bar.setVisible(False); self.run_button.setEnabled(True); self.statusBar().clearMessage()
 
     def _on_pattern_mode_change(self):
         self.preset_combo.setEnabled(self.preset_radio.isChecked()); self.custom_regex_widgets.setEnabled(not self.preset_radio.isChecked())
@@ -210,14 +301,25 @@ class PiiApp(QMainWindow):
     def _get_expected_counts(self) -> Dict[str, Optional[int]]:
         return {key: int(w.text()) if w.text().isdigit() else None for key, w in self.expected_count_widgets.items()}
 
+    def _lint_regex(self, key: str):
+        """Validates a custom pattern as it is typed; the run path then only skips already-flagged fields."""
+        widget = self.regex_widgets[key]; pattern_text = widget.text().strip()
+        try:
+            if pattern_text: compile_pattern(pattern_text, re.ASCII)
+            widget.setStyleSheet(""); widget.setToolTip("")
+        except re.error as e:
+            widget.setStyleSheet("border: 1px solid #E74C3C;"); widget.setToolTip(f"Invalid regex: {e}. It will be ignored.")
+
     def _compile_overrides(self) -> Dict[str, re.Pattern]:
-        if self.preset_radio.isChecked(): return {}
+        if self.preset_radio.isChecked(): return get_compiled_preset(self.preset_combo.currentText())
         compiled = {}
         for key, widget in self.regex_widgets.items():
             pattern_text = widget.text().strip()
             if pattern_text:
-                try: compiled[key] = re.compile(pattern_text)
-                except re.error as e: QMessageBox.warning(self, "Regex Error", f"Invalid {self.pii_labels[key]} regex: {e}. It will be ignored.")
+                # PII tokens are ASCII; re.ASCII keeps \d/\w/\b out of the Unicode tables.
+                # Invalid fields are already flagged red by _lint_regex; no popup here.
+                try: compiled[key] = compile_pattern(pattern_text, re.ASCII)
+                except re.error: continue
         return compiled
 
     def _render_summary(self):
@@ -234,11 +336,10 @@ class PiiApp(QMainWindow):
         self.summary_text.setText("\n".join(report))
 
     def _render_preview(self):
-        self.preview_table.setRowCount(len(self.deidentified_rows)); self.preview_table.setColumnCount(len(self.headers))
-        self.preview_table.setHorizontalHeaderLabels(self.headers)
-        for r, row_data in enumerate(self.deidentified_rows):
-            for c, cell_data in enumerate(row_data): self.preview_table.setItem(r, c, QTableWidgetItem(cell_data))
-        self.preview_table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeToContents)
+        self.preview_table.setModel(DeidModel(self.headers, self.deidentified_rows, self.preview_table))
+        header = self.preview_table.horizontalHeader(); header.setSectionResizeMode(QHeaderView.Interactive)
+        # Sizing every column walks all rows; only the first visible ones are worth it.
+        for c in range(min(len(self.headers), 20)): self.preview_table.resizeColumnToContents(c)
 
     def _save_deidentified(self):
         if not self.deidentified_rows: QMessageBox.warning(self, "No Data", "No de-identified data to save."); return
@@ -247,7 +348,8 @@ class PiiApp(QMainWindow):
             path, _ = QFileDialog.getSaveFileName(self, "Save De-Identified CSV", f"{base_name}_deidentified.csv", "CSV Files (*.csv)")
             if not path: return
             try:
-                with open(path, "w", newline="", encoding="utf-8") as f:
+                # A 1 MiB buffer turns per-row writes into few large syscalls.
+                with open(path, "w", newline="", encoding="utf-8", buffering=_SAVE_BUFFER_BYTES) as f:
                     writer = csv.writer(f);
                     if self.headers: writer.writerow(self.headers)
                     writer.writerows(self.deidentified_rows)
@@ -257,8 +359,8 @@ class PiiApp(QMainWindow):
             path, _ = QFileDialog.getSaveFileName(self, "Save De-Identified Text File", f"{base_name}_deidentified.txt", "Text Files (*.txt)")
             if not path: return
             try:
-                with open(path, "w", encoding="utf-8") as f:
-                    for row in self.deidentified_rows: f.write(row[0] + "\n")
+                with open(path, "w", encoding="utf-8", buffering=_SAVE_BUFFER_BYTES) as f:
+                    f.writelines(row[0] + "\n" for row in self.deidentified_rows)
                 QMessageBox.information(self, "Success", f"De-identified text saved to {path}")
             except Exception as e: QMessageBox.critical(self, "Error", f"Failed to save file: {e}")
 
@@ -273,18 +375,17 @@ class PiiApp(QMainWindow):
 
     def _clear_outputs(self):
         self.deidentified_rows, self.headers, self.summary, self.report_metrics = [], [], {}, {}
-        self.summary_text.clear(); self.preview_table.setRowCount(0); self.preview_table.setColumnCount(0)
+        self.summary_text.clear(); self.preview_table.setModel(None)
     
     def closeEvent(self, event: QCloseEvent):
-        """Handle the window close event to safely stop the worker thread."""
-        if self.thread and self.thread.isRunning():
+        """Handle the window close event to safely stop the worker."""
+        if self._scan_running and self.worker:
             reply = QMessageBox.question(self, 'Confirm Exit', 'A scan is in progress. Are you sure you want to exit?',
                                          QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No,
                                          QMessageBox.StandardButton.No)
             if reply == QMessageBox.StandardButton.Yes:
                 self.worker.stop()
-                self.thread.quit()
-                self.thread.wait(5000) # Wait up to 5 seconds
+                QThreadPool.globalInstance().waitForDone(5000)  # Wait up to 5 seconds
                 event.accept()
             else:
                 event.ignore()
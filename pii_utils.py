@@ -1,30 +1,51 @@
 import re
 import hashlib
+import functools
+import random
+from itertools import cycle
+from operator import xor
 from typing import Dict, List, Pattern, Optional, TypedDict
 import base64
 
+try:
+    import re2  # google-re2, optional linear-time engine
+except ImportError:
+    re2 = None
+
+# Compiled once; the handlers strip separators from every candidate match.
+_NON_DIGIT_RE = re.compile(r"[^0-9]+")
+
 # --- Verhoeff Algorithm for Aadhaar Validation ---
+# Multiplication and permutation tables, built once instead of per validated match.
+_VERHOEFF_D = ((0,1,2,3,4,5,6,7,8,9),(1,2,3,4,0,6,7,8,9,5),(2,3,4,0,1,7,8,9,5,6),(3,4,0,1,2,8,9,5,6,7),(4,0,1,2,3,9,5,6,7,8),(5,9,8,7,6,0,4,3,2,1),(6,5,9,8,7,1,0,4,3,2),(7,6,5,9,8,2,1,0,4,3),(8,7,6,5,9,3,2,1,0,4),(9,8,7,6,5,4,3,2,1,0))
+_VERHOEFF_P = ((0,1,2,3,4,5,6,7,8,9),(1,5,7,6,2,8,3,0,9,4),(5,8,0,3,7,9,6,1,4,2),(8,9,1,6,0,4,3,5,2,7),(9,4,5,3,1,2,6,8,7,0),(4,2,8,6,5,7,9,3,0,1),(2,7,9,3,8,0,4,6,1,5),(7,0,4,6,9,1,3,2,5,8))
+
 def aadhaar_verhoeff(number: str) -> bool:
     """Validates an Aadhaar number using the Verhoeff algorithm."""
     try:
-        number = re.sub(r"[^0-9]", "", number)
-        d_table = [[0,1,2,3,4,5,6,7,8,9],[1,2,3,4,0,6,7,8,9,5],[2,3,4,0,1,7,8,9,5,6],[3,4,0,1,2,8,9,5,6,7],[4,0,1,2,3,9,5,6,7,8],[5,9,8,7,6,0,4,3,2,1],[6,5,9,8,7,1,0,4,3,2],[7,6,5,9,8,2,1,0,4,3],[8,7,6,5,9,3,2,1,0,4],[9,8,7,6,5,4,3,2,1,0]]
-        p_table = [[0,1,2,3,4,5,6,7,8,9],[1,5,7,6,2,8,3,0,9,4],[5,8,0,3,7,9,6,1,4,2],[8,9,1,6,0,4,3,5,2,7],[9,4,5,3,1,2,6,8,7,0],[4,2,8,6,5,7,9,3,0,1],[2,7,9,3,8,0,4,6,1,5],[7,0,4,6,9,1,3,2,5,8]]
+        number = _NON_DIGIT_RE.sub("", number)
         c = 0
         for i, item in enumerate(reversed(number)):
-            c = d_table[c][p_table[i % 8][int(item)]]
+            c = _VERHOEFF_D[c][_VERHOEFF_P[i % 8][int(item)]]
         return c == 0
     except (ValueError, IndexError):
         return False
 
 XOR_KEY = "YourSecretKeyForPIIDetection"
-def encrypt_decrypt(text: str, key: str) -> str: return "".join(chr(ord(c) ^ ord(k)) for c, k in zip(text, key * (len(text) // len(key) + 1)))
+
+@functools.lru_cache(maxsize=8)
+def _key_ords(key: str) -> tuple:
+    return tuple(ord(k) for k in key)
+
+def encrypt_decrypt(text: str, key: str) -> str:
+    # map/cycle over a cached key table keeps the XOR loop in C instead of a per-char generator.
+    return "".join(map(chr, map(xor, map(ord, text), cycle(_key_ords(key)))))
 
 class EmailPseudonymizer:
-    def __init__(self): self.mapping: Dict[str, str] = {}; self.counter: int = 1
+    def __init__(self): self.mapping: Dict[str, str] = {}
     def pseudonymize(self, local_part: str) -> str:
-        if local_part not in self.mapping: self.mapping[local_part] = f"user{self.counter}"; self.counter += 1
-        return self.mapping[local_part]
+        # Single hash lookup; the map size doubles as the pseudonym counter.
+        return self.mapping.setdefault(local_part, f"user{len(self.mapping) + 1}")
 
 class DetectionCounts(TypedDict, total=False):
     aadhaar: int; pan: int; credit_card: int; email: int; passport: int;
@@ -36,7 +57,19 @@ EMAIL_PATTERN = re.compile(r"\b([A-Za-z0-9._%+-]+@([A-Za-z0-9.-]+\.[A-Za-z]{2,})
 PASSPORT_PATTERN = re.compile(r"\b([A-Z]\d{7})\b")
 DRIVING_LICENSE_PATTERN = re.compile(r"\b(([A-Z]{2})-?(\d{13}))\b")
 PHONE_PATTERN = re.compile(r"\b(?:\+91[\s-]?)?([6-9]\d{9})\b")
-PERSON_PATTERN = re.compile(r"\b([A-Z][a-z]{2,}(?:\s[A-Z][a-z]{2,})+)\b")
+# Capitalized tokens that start common non-name phrases ("Dear Customer
+# Care", "New Delhi Road", "Thank You"). Fused into PERSON_PATTERN as a
+# negative lookahead so the regex engine rejects these at match time and
+# the masking/pseudonymization machinery never runs for them.
+_NON_NAME_TOKENS = (
+    "Dear", "The", "This", "That", "From", "Subject", "Hello", "Thank",
+    "Thanks", "Regards", "Sincerely", "Please", "Your", "Our", "New",
+    "Old", "North", "South", "East", "West",
+    "January", "February", "March", "April", "June", "July", "August",
+    "September", "October", "November", "December",
+)
+_NON_NAME_UNION = "|".join(_NON_NAME_TOKENS)
+PERSON_PATTERN = re.compile(rf"\b(?!(?:{_NON_NAME_UNION})\b)([A-Z][a-z]{{2,}}(?:\s[A-Z][a-z]{{2,}})+)\b")
 VOTER_ID_PATTERN = re.compile(r"\b([A-Z]{3}\d{7})\b")
 DOB_PATTERN = re.compile(r"\b(\d{2}[/-]\d{2}[/-]\d{4}|\d{4}[/-]\d{2}[/-]\d{2})\b")
 
@@ -70,141 +103,192 @@ PATTERN_PRESETS = {
 class MaskConfig(TypedDict):
     enabled: bool; strategy: str; char: str
 
+# Pre-bound so the per-match hash/encrypt paths skip module attribute lookups;
+# CPython's hashlib.sha256 already uses OpenSSL's hardware-accelerated implementation.
+_sha256 = hashlib.sha256
+_b64encode = base64.b64encode
+
+@functools.lru_cache(maxsize=4096)
+def _hash_text(text: str) -> str:
+    """SHA-256 hexdigest, cached: the same value recurring across a file hashes once."""
+    return _sha256(text.encode()).hexdigest()
+
+# Mask runs are served as slices of one cached string per mask character that
+# grows on demand, so repeated full-length masks reuse a single allocation
+# instead of rebuilding char * n for every match.
+_MASK_CACHE: dict[str, str] = {}
+
+def _mask_of(char: str, n: int) -> str:
+    base = _MASK_CACHE.get(char)
+    if base is None or len(base) < n:
+        base = char * max(n, 64)
+        _MASK_CACHE[char] = base
+    return base[:n]
+
+# Non-partial strategies dispatched by one dict lookup instead of walking a
+# string-comparison chain per match; "partial" (the default and hottest path)
+# is special-cased in _apply_mask since it alone needs the handler's closure.
+_STRATEGY_FUNCS = {
+    "full": lambda m, mask_char, pii_type: _mask_of(mask_char, m.end() - m.start()),
+    "hash": lambda m, mask_char, pii_type: _hash_text(m.group(0)),
+    "encrypt": lambda m, mask_char, pii_type: _b64encode(encrypt_decrypt(m.group(0), XOR_KEY).encode()).decode(),
+    "redact": lambda m, mask_char, pii_type: f"[{pii_type.upper()}_REDACTED]",
+}
+
 def _apply_mask(m: re.Match[str], strategy: str, mask_char: str, pii_type: str, partial_mask_func: callable) -> str:
-    original_text = m.group(0)
     if strategy == "partial": return partial_mask_func(m)
-    if strategy == "full": return mask_char * len(original_text)
-    if strategy == "hash": return hashlib.sha256(original_text.encode()).hexdigest()
-    if strategy == "encrypt":
-        encrypted = encrypt_decrypt(original_text, XOR_KEY)
-        return base64.b64encode(encrypted.encode()).decode()
-    if strategy == "redact": return f"[{pii_type.upper()}_REDACTED]"
-    return original_text
+    func = _STRATEGY_FUNCS.get(strategy)
+    return func(m, mask_char, pii_type) if func is not None else m.group(0)
+
+# Doubled-digit values with the >9 fold pre-applied, so the Luhn loop is branchless.
+_LUHN_DOUBLE = (0, 2, 4, 6, 8, 1, 3, 5, 7, 9)
 
 def luhn_checksum_ok(number: str) -> bool:
-    digits = [int(c) for c in number if c.isdigit()]; total = 0
+    digits = [int(c) for c in number if c.isdigit()]
     if not 13 <= len(digits) <= 19: return False
     parity = len(digits) % 2
-    for i, d in enumerate(digits):
-        if i % 2 == parity: d *= 2
-        if d > 9: d -= 9
-        total += d
+    total = sum(_LUHN_DOUBLE[d] if i % 2 == parity else d for i, d in enumerate(digits))
     return total % 10 == 0
 
+def _replace_all(pattern: Pattern[str], repl: callable, text: str) -> tuple[str, int]:
+    """subn-style substitution via finditer and a single join.
+
+    Unmatched text is copied as slices rather than through the sre template
+    machinery, and repl may return None to leave a match untouched without
+    it being counted.
+    """
+    parts, last, count = [], 0, 0
+    for m in pattern.finditer(text):
+        replacement = repl(m)
+        if replacement is None: continue
+        parts.append(text[last:m.start()]); parts.append(replacement)
+        last = m.end(); count += 1
+    if not parts: return text, 0
+    parts.append(text[last:])
+    return "".join(parts), count
+
+# The handlers below bind strategy/char/context from kwargs once per call and
+# define their partial-mask function at call level, so nothing is allocated or
+# looked up per match beyond the replacement itself.
+
 def mask_aadhaar(text: str, pattern: Optional[Pattern[str]] = None, **kwargs) -> tuple[str, int]:
-    count = 0
-    def repl(m: re.Match[str]) -> str:
-        nonlocal count
-        raw = re.sub(r'[^0-9]', '', m.group(0))
-        if len(raw) != 12 or not aadhaar_verhoeff(raw): return m.group(0)
-        count += 1
-        def partial(match: re.Match[str]) -> str: return f"{raw[:4]}-{kwargs.get('char', '*')*4}-{raw[8:]}"
-        return _apply_mask(m, kwargs.get("strategy", "partial"), kwargs.get("char", "*"), "Aadhaar", partial)
+    strategy, char = kwargs.get("strategy", "partial"), kwargs.get("char", "*")
+    def partial(match: re.Match[str]) -> str:
+        raw = _NON_DIGIT_RE.sub('', match.group(0))
+        return f"{raw[:4]}-{char*4}-{raw[8:]}"
+    def repl(m: re.Match[str]) -> Optional[str]:
+        raw = _NON_DIGIT_RE.sub('', m.group(0))
+        if len(raw) != 12 or not aadhaar_verhoeff(raw): return None
+        return _apply_mask(m, strategy, char, "Aadhaar", partial)
     p = pattern or AADHAAR_PATTERN
-    masked_text = p.sub(repl, text)
-    return masked_text, count
+    return _replace_all(p, repl, text)
+
+def generate_synthetic_pan() -> str:
+    # One choices() call per character class instead of one choice() per character.
+    c1, c2, c3 = random.choices('BCDFGHJKLMNPQRSTVWXYZ', k=3)
+    v1, v2 = random.choices('AEIOU', k=2)
+    return f"{c1}{v1}{c2}{v2}{c3}{random.randint(0, 9999):04d}{random.choice('ABCDEFGHIJKLMNOPQRSTUVWXYZ')}"
+
+def generate_synthetic_voter_id() -> str:
+    return f"{''.join(random.choices('ABCDEFGHIJKLMNOPQRSTUVWXYZ', k=3))}{random.randint(0, 9999999):07d}"
 
 def anonymize_pan(text: str, pattern: Optional[Pattern[str]] = None, **kwargs) -> tuple[str, int]:
-    import random
-    def generate_synthetic_pan():
-        consonants = 'BCDFGHJKLMNPQRSTVWXYZ'
-        vowels = 'AEIOU'
-        return f"{random.choice(consonants)}{random.choice(vowels)}{random.choice(consonants)}{random.choice(vowels)}{random.choice(consonants)}{random.randint(0, 9999):04d}{random.choice('ABCDEFGHIJKLMNOPQRSTUVWXYZ')}"
-    
+    strategy, char = kwargs.get("strategy", "partial"), kwargs.get("char", "*")
+    def partial(match: re.Match[str]) -> str:
+        return generate_synthetic_pan()
     def repl(m: re.Match[str]) -> str:
-        def partial(match: re.Match[str]) -> str:
-            return generate_synthetic_pan()  
-        return _apply_mask(m, kwargs.get("strategy", "partial"), kwargs.get("char", "*"), "PAN", partial)
+        return _apply_mask(m, strategy, char, "PAN", partial)
     p = pattern or PAN_PATTERN
-    return p.subn(repl, text)
+    return _replace_all(p, repl, text)
 
 def mask_credit_cards(text: str, pattern: Optional[Pattern[str]] = None, **kwargs) -> tuple[str, int]:
-    count = 0
-    def repl(m: re.Match[str]) -> str:
-        nonlocal count
-        raw = re.sub(r"[^\d]", "", m.group(0))
-        if not luhn_checksum_ok(raw): return m.group(0)
-        count += 1
-        def partial(_) -> str: return f"{kwargs.get('char', '*')*4}-{kwargs.get('char', '*')*4}-{kwargs.get('char', '*')*4}-{raw[-4:]}"
-        return _apply_mask(m, kwargs.get("strategy", "partial"), kwargs.get("char", "*"), "Credit Card", partial)
+    strategy, char = kwargs.get("strategy", "partial"), kwargs.get("char", "*")
+    def partial(match: re.Match[str]) -> str:
+        raw = _NON_DIGIT_RE.sub("", match.group(0))
+        return f"{char*4}-{char*4}-{char*4}-{raw[-4:]}"
+    def repl(m: re.Match[str]) -> Optional[str]:
+        raw = _NON_DIGIT_RE.sub("", m.group(0))
+        if not luhn_checksum_ok(raw): return None
+        return _apply_mask(m, strategy, char, "Credit Card", partial)
     p = pattern or CREDIT_CARD_PATTERN
-    return p.sub(repl, text), count
+    return _replace_all(p, repl, text)
 
 def pseudo_email(text: str, pattern: Optional[Pattern[str]] = None, **kwargs) -> tuple[str, int]:
+    strategy, char, context = kwargs.get("strategy", "partial"), kwargs.get("char", "*"), kwargs.get("context")
+    # Resolved once per call; every match then skips the context lookup.
+    anonymizer = context.setdefault('email_anonymizer', EmailPseudonymizer()) if strategy == "partial" and context and isinstance(context, dict) else None
+    def partial(match: re.Match[str]) -> str:
+        full_email = match.group(1)
+        if '@' not in full_email: return f"Invalid Email Match: {full_email}"
+        local, domain = full_email.rsplit('@', 1)
+        if anonymizer is not None:
+            return f"{anonymizer.pseudonymize(local)}@{domain}"
+        return f"user@{domain}"
     def repl(m: re.Match[str]) -> str:
-        def partial(match: re.Match[str]) -> str:
-            full_email = match.group(1)
-            if '@' not in full_email: return f"Invalid Email Match: {full_email}"
-            local, domain = full_email.rsplit('@', 1)
-            context = kwargs.get("context")
-            if context and isinstance(context, dict):
-                anonymizer = context.setdefault('email_anonymizer', EmailPseudonymizer())
-                return f"{anonymizer.pseudonymize(local)}@{domain}"
-            return f"user@{domain}"
-        return _apply_mask(m, kwargs.get("strategy", "partial"), kwargs.get("char", "*"), "Email", partial)
+        return _apply_mask(m, strategy, char, "Email", partial)
     p = pattern or EMAIL_PATTERN
-    return p.subn(repl, text)
+    return _replace_all(p, repl, text)
 
 def mask_passport(text: str, pattern: Optional[Pattern[str]] = None, **kwargs) -> tuple[str, int]:
+    strategy, char = kwargs.get("strategy", "partial"), kwargs.get("char", "*")
+    def partial(match: re.Match[str]) -> str:
+        raw = match.group(0)
+        return f"{raw[0]}{_mask_of(char, len(raw) - 1)}"
     def repl(m: re.Match[str]) -> str:
-        def partial(match: re.Match[str]) -> str:
-            raw = match.group(0)
-            return f"{raw[0]}{kwargs.get('char', '*')*(len(raw)-1)}"
-        return _apply_mask(m, kwargs.get("strategy", "partial"), kwargs.get("char", "*"), "Passport", partial)
+        return _apply_mask(m, strategy, char, "Passport", partial)
     p = pattern or PASSPORT_PATTERN
-    return p.subn(repl, text)
+    return _replace_all(p, repl, text)
 
 def mask_driving_license(text: str, pattern: Optional[Pattern[str]] = None, **kwargs) -> tuple[str, int]:
+    strategy, char = kwargs.get("strategy", "partial"), kwargs.get("char", "*")
+    def partial(match: re.Match[str]) -> str:
+        state_code = match.group(2) or ""
+        return f"{state_code}{char*14}" if state_code else match.group(0)
     def repl(m: re.Match[str]) -> str:
-        def partial(match: re.Match[str]) -> str:
-            state_code = match.group(2) or ""
-            return f"{state_code}{kwargs.get('char', '*')*14}" if state_code else match.group(0)
-        return _apply_mask(m, kwargs.get("strategy", "partial"), kwargs.get("char", "*"), "Driving License", partial)
+        return _apply_mask(m, strategy, char, "Driving License", partial)
     p = pattern or DRIVING_LICENSE_PATTERN
-    return p.subn(repl, text)
+    return _replace_all(p, repl, text)
 
 def mask_phone(text: str, pattern: Optional[Pattern[str]] = None, **kwargs) -> tuple[str, int]:
+    strategy, char = kwargs.get("strategy", "partial"), kwargs.get("char", "*")
+    def partial(match: re.Match[str]) -> str:
+        raw = _NON_DIGIT_RE.sub('', match.group(0))[-10:]
+        return f"{raw[:2]}{char*6}{raw[-2:]}"
     def repl(m: re.Match[str]) -> str:
-        def partial(match: re.Match[str]) -> str:
-            raw = re.sub(r'[^\d]', '', match.group(0))[-10:]
-            return f"{raw[:2]}{kwargs.get('char', '*')*6}{raw[-2:]}"
-        return _apply_mask(m, kwargs.get("strategy", "partial"), kwargs.get("char", "*"), "Phone", partial)
+        return _apply_mask(m, strategy, char, "Phone", partial)
     p = pattern or PHONE_PATTERN
-    return p.subn(repl, text)
+    return _replace_all(p, repl, text)
 
 def mask_person(text: str, pattern: Optional[Pattern[str]] = None, **kwargs) -> tuple[str, int]:
+    strategy, char, context = kwargs.get("strategy", "partial"), kwargs.get("char", "*"), kwargs.get("context")
+    anonymizer = context.setdefault('person_anonymizer', EmailPseudonymizer()) if strategy == "partial" and context and isinstance(context, dict) else None
+    def partial(match: re.Match[str]) -> str:
+        parts = match.group(0).split()
+        if anonymizer is not None:
+            return " ".join(anonymizer.pseudonymize(p) for p in parts)
+        return " ".join(p[0] + char * (len(p) - 1) for p in parts)
     def repl(m: re.Match[str]) -> str:
-        def partial(match: re.Match[str]) -> str:
-            parts = match.group(0).split()
-            context = kwargs.get("context")
-            if context and isinstance(context, dict):
-                anonymizer = context.setdefault('person_anonymizer', EmailPseudonymizer())
-                return " ".join(anonymizer.pseudonymize(p) for p in parts)
-            return " ".join(p[0] + kwargs.get('char', '*') * (len(p) - 1) for p in parts)
-        return _apply_mask(m, kwargs.get("strategy", "partial"), kwargs.get("char", "*"), "Person", partial)
+        return _apply_mask(m, strategy, char, "Person", partial)
     p = pattern or PERSON_PATTERN
-    return p.subn(repl, text)
+    return _replace_all(p, repl, text)
 
 def mask_voter_id(text: str, pattern: Optional[Pattern[str]] = None, **kwargs) -> tuple[str, int]:
-    import random
-    def generate_synthetic_voter_id():
-        return f"{random.choice('ABCDEFGHIJKLMNOPQRSTUVWXYZ')}{random.choice('ABCDEFGHIJKLMNOPQRSTUVWXYZ')}{random.choice('ABCDEFGHIJKLMNOPQRSTUVWXYZ')}{random.randint(0, 9999999):07d}"
-    
+    strategy, char = kwargs.get("strategy", "partial"), kwargs.get("char", "*")
+    def partial(match: re.Match[str]) -> str:
+        return generate_synthetic_voter_id()
     def repl(m: re.Match[str]) -> str:
-        def partial(match: re.Match[str]) -> str:
-            return generate_synthetic_voter_id()  
-        return _apply_mask(m, kwargs.get("strategy", "partial"), kwargs.get("char", "*"), "VoterID", partial)
+        return _apply_mask(m, strategy, char, "VoterID", partial)
     p = pattern or VOTER_ID_PATTERN
-    return p.subn(repl, text)
+    return _replace_all(p, repl, text)
 
 def mask_dob(text: str, pattern: Optional[Pattern[str]] = None, **kwargs) -> tuple[str, int]:
+    strategy, char = kwargs.get("strategy", "partial"), kwargs.get("char", "*")
+    def partial(match: re.Match[str]) -> str:
+        return _mask_of(char, len(match.group(0)))
     def repl(m: re.Match[str]) -> str:
-        def partial(match: re.Match[str]) -> str:
-            raw = match.group(0)
-            return f"{kwargs.get('char', '*')*len(raw)}"
-        return _apply_mask(m, kwargs.get("strategy", "partial"), kwargs.get("char", "*"), "DOB", partial)
+        return _apply_mask(m, strategy, char, "DOB", partial)
     p = pattern or DOB_PATTERN
-    return p.subn(repl, text)
+    return _replace_all(p, repl, text)
 
 PII_HANDLERS = {
     "aadhaar": mask_aadhaar,
@@ -222,24 +306,180 @@ PII_HANDLERS = {
 def get_preset_patterns(preset_name: str) -> Dict[str, str]: return PATTERN_PRESETS.get(preset_name, PATTERN_PRESETS["Indian (Default)"])
 def get_available_presets() -> List[str]: return list(PATTERN_PRESETS.keys())
 
-def process_text(text: str, patterns: Optional[Dict] = None, mask_configs: Optional[Dict] = None, context: Optional[Dict] = None) -> tuple[str, Dict]:
-    counts: Dict = {key: 0 for key in PII_HANDLERS}
+@functools.lru_cache(maxsize=256)
+def compile_pattern(src: str, flags: int = 0) -> Pattern[str]:
+    """Compiles a pattern once and caches it, so repeated runs with the same regexes reuse the compiled object."""
+    return re.compile(src, flags)
+
+def get_compiled_preset(preset_name: str) -> Dict[str, Pattern[str]]:
+    """Returns the preset's non-empty patterns as cached compiled objects."""
+    return {key: compile_pattern(src) for key, src in get_preset_patterns(preset_name).items() if src}
+
+class PatternSet:
+    """Prefilter interface: one pass over a cell yields the set of pattern keys that occur in it."""
+    def match(self, text: str) -> set: raise NotImplementedError
+
+# Constructs RE2 rejects by design: lookaround ((?=, (?!, (?<=, (?<!) and
+# numbered or named backreferences. Screening for them up front keeps the
+# C++ library from logging a parse-error block to stderr on every Add.
+_RE2_UNSUPPORTED = re.compile(r"\(\?P?<?[=!]|\\[1-9]").search
+
+class Re2PatternSet(PatternSet):
+    """RE2 set over the effective pattern of every enabled PII type.
+
+    One linear-time DFA pass per cell, so only the matching handlers are
+    invoked. Patterns RE2 cannot take (backrefs/lookaround) are kept in
+    `always` and scanned with `re`.
+    """
+    def __init__(self, sources: Dict[str, str]):
+        # SearchSet() is the unanchored constructor; the binding has no
+        # module-level anchoring constants.
+        self._set = re2.Set.SearchSet()
+        self._id_to_key: List[str] = []
+        self.always: set = set()
+        for key, src in sources.items():
+            if _RE2_UNSUPPORTED(src):
+                self.always.add(key); continue
+            try:
+                self._set.Add(src); self._id_to_key.append(key)
+            except re2.error:
+                self.always.add(key)
+        self._set.Compile()
+
+    def match(self, text: str) -> set:
+        ids = self._set.Match(text) or []
+        return {self._id_to_key[i] for i in ids} | self.always
+
+class CombinedPatternSet(PatternSet):
+    """Stdlib fallback: all patterns joined into one alternation of named groups.
+
+    An alternation only reports the first alternative at overlapping
+    positions, so per-type attribution from one sweep is unsound; the
+    combined pattern is used as a presence gate instead. Cells with no
+    PII-shaped text (the common case) skip every handler after a single
+    scan, and any hit defers exact typing to the handlers.
+    """
+    def __init__(self, sources: Dict[str, str]):
+        self._keys = set(sources)
+        self._combined = re.compile("|".join(f"(?P<{key}>{src})" for key, src in sources.items()))
+
+    def match(self, text: str) -> set:
+        return set(self._keys) if self._combined.search(text) else set()
+
+def _effective_sources(patterns: Optional[Dict], mask_configs: Optional[Dict]) -> Dict[str, str]:
+    defaults = PATTERN_PRESETS["Indian (Default)"]
+    sources = {}
+    for key in PII_HANDLERS:
+        if mask_configs is not None and not (mask_configs.get(key) or {}).get("enabled"): continue
+        override = (patterns or {}).get(key)
+        src = override.pattern if isinstance(override, re.Pattern) else (override or defaults.get(key, ""))
+        if src: sources[key] = src
+    return sources
+
+def build_pattern_set(patterns: Optional[Dict] = None, mask_configs: Optional[Dict] = None) -> Optional[PatternSet]:
+    """Builds a prefilter over the enabled PII types: RE2 when available, else one combined re alternation."""
+    sources = _effective_sources(patterns, mask_configs)
+    if not sources: return None
+    if re2 is not None:
+        try:
+            return Re2PatternSet(sources)
+        except re2.error:
+            pass
+    # Numbered backrefs silently re-point and named groups can collide once
+    # patterns are merged; such custom patterns fall back to per-pattern scans.
+    if any(re.search(r"\\\d|\(\?P", src) for src in sources.values()): return None
+    try:
+        return CombinedPatternSet(sources)
+    except re.error:
+        return None
+
+# Template zero-count dict; copying it per cell beats rebuilding the comprehension.
+_ZERO_COUNTS = dict.fromkeys(PII_HANDLERS, 0)
+
+# Every default ID pattern requires a digit and the email pattern an '@';
+# one cheap literal probe skips those handlers when no prefilter set exists.
+_DIGIT_SEARCH = re.compile(r"\d").search
+_DIGIT_KEYS = frozenset(("aadhaar", "pan", "credit_card", "passport", "driving_license", "phone", "voter_id", "dob"))
+
+def process_text(text: str, patterns: Optional[Dict] = None, mask_configs: Optional[Dict] = None, context: Optional[Dict] = None, pattern_set: Optional[PatternSet] = None) -> tuple[str, Dict]:
+    counts: Dict = _ZERO_COUNTS.copy()
+    hits = pattern_set.match(text) if pattern_set is not None else None
+    has_digit = True if hits is not None else _DIGIT_SEARCH(text) is not None
     for key, handler in PII_HANDLERS.items():
+        if hits is not None and key not in hits: continue
         config = (mask_configs or {}).get(key, {"enabled": False})
         if config.get("enabled"):
-            config['context'] = context; pattern_override = (patterns or {}).get(key)
+            pattern_override = (patterns or {}).get(key)
+            if hits is None and pattern_override is None:
+                if key in _DIGIT_KEYS and not has_digit: continue
+                if key == "email" and "@" not in text: continue
+            config['context'] = context
             text, count = handler(text, pattern=pattern_override, **config)
             counts[key] += count
     return text, counts
 
-def detect_and_deidentify_record(row: List[str], patterns: Optional[Dict] = None, mask_configs: Optional[Dict] = None, context: Optional[Dict] = None) -> tuple[List[str], Dict]:
-    out_row, total_counts = [], {key: 0 for key in PII_HANDLERS}
-    for cell in row:
-        masked_cell, cell_counts = process_text(cell or "", patterns, mask_configs, context=context)
+_CELL_CACHE_MAX = 4096
+# NUL: outside every pattern's character classes and - unlike \x1f, which re
+# counts as \s - matches neither \s nor \w, so joining cells with it preserves
+# \b boundaries at the former cell edges and no pattern can span two cells.
+_CELL_SEP = "\x00"
+
+def detect_and_deidentify_record(row: List[str], patterns: Optional[Dict] = None, mask_configs: Optional[Dict] = None, context: Optional[Dict] = None, pattern_set: Optional[PatternSet] = None, cache: Optional[Dict] = None) -> tuple[List[str], Dict]:
+    """De-identifies one row.
+
+    Multi-cell rows are joined with the unit separator and scanned in one
+    process_text pass instead of per cell; if a custom pattern ever eats a
+    separator the row falls back to the per-cell path. `cache` is an
+    optional run-scoped dict memoizing (masked, counts) per raw value, so
+    repeated rows/cells are scanned once and duplicates receive identical
+    masked output. Row and cell entries carry different value shapes, so
+    their keys are tagged: a cell containing NUL must not collide with a
+    multi-cell row whose join spells the same string.
+    """
+    cells = [cell or "" for cell in row]
+    if len(cells) > 1 and not any(_CELL_SEP in cell for cell in cells):
+        joined = _CELL_SEP.join(cells)
+        cached = cache.get(("row", joined)) if cache is not None else None
+        if cached is not None: return list(cached[0]), dict(cached[1])
+        masked, counts = process_text(joined, patterns, mask_configs, context=context, pattern_set=pattern_set)
+        parts = masked.split(_CELL_SEP)
+        if len(parts) == len(cells):
+            if cache is not None and len(cache) < _CELL_CACHE_MAX: cache[("row", joined)] = (tuple(parts), counts)
+            return parts, counts
+    out_row, total_counts = [], _ZERO_COUNTS.copy()
+    for cell in cells:
+        cached = cache.get(("cell", cell)) if cache is not None else None
+        if cached is None:
+            masked_cell, cell_counts = process_text(cell, patterns, mask_configs, context=context, pattern_set=pattern_set)
+            if cache is not None and len(cache) < _CELL_CACHE_MAX: cache[("cell", cell)] = (masked_cell, cell_counts)
+        else:
+            masked_cell, cell_counts = cached
         out_row.append(masked_cell)
         for key in total_counts: total_counts[key] += cell_counts.get(key, 0)
     return out_row, total_counts
 
+def calculate_metrics(summary: Dict, expected_counts: Dict[str, Optional[int]]) -> Dict[str, Dict]:
+    """Computes per-type accuracy metrics (TP/FP, precision, recall, F1, risk) in a single pass."""
+    metrics = {}
+    for key in PII_HANDLERS.keys():
+        found = summary['matches'].get(key, 0)
+        expected = expected_counts.get(key, None)
+        tp = min(found, expected) if expected is not None else found
+        fp = max(0, found - expected) if expected is not None else 0
+        fn = max(0, expected - found) if expected is not None else 0
+        precision = tp / (tp + fp) if (tp + fp) > 0 else 0.0
+        recall = tp / (tp + fn) if (tp + fn) > 0 else 0.0
+        f1 = 2 * (precision * recall) / (precision + recall) if (precision + recall) > 0 else 0.0
+        risk_level = "N/A"
+        if expected is not None:
+            if tp == 0 and fp > 0: risk_level = "Critical"
+            elif tp > 0 and fp == 0: risk_level = "Low"
+            elif precision >= 0.8: risk_level = "Medium"
+            elif precision >= 0.5: risk_level = "High"
+            else: risk_level = "Critical"
+        metrics[key] = {"found": found, "expected": expected, "tp": tp, "fp": fp, "precision": precision, "recall": recall, "f1": f1, "risk": risk_level}
+    return metrics
+
 # Adding compatibility with image methods
 def apply_deidentification(text: str, strategy: str, pii_type: str, **kwargs) -> str:
     config = {"enabled": True, "strategy": strategy, "char": kwargs.get("char", "*")}
@@ -6,7 +6,8 @@ import tempfile
 from werkzeug.utils import secure_filename
 from pii_utils import (
     detect_and_deidentify_record, get_preset_patterns,
-    get_available_presets, PII_HANDLERS, PATTERN_PRESETS
+    get_available_presets, build_pattern_set, compile_pattern,
+    get_compiled_preset, calculate_metrics, PII_HANDLERS, PATTERN_PRESETS
 )
 import re
 from typing import Dict, List, Optional
@@ -28,24 +29,28 @@ def allowed_file(filename):
 def process_file(file_path, patterns, mask_configs, expected_counts):
     """Process uploaded file and return results"""
     try:
-        headers, input_rows = [], []
         file_ext = os.path.splitext(file_path)[1].lower()
-        
+
         if file_ext == '.csv':
-            headers, input_rows = read_csv(file_path)
+            row_iter = iter_csv(file_path)
         elif file_ext == '.txt':
-            headers, input_rows = read_txt(file_path)
+            row_iter = iter_txt(file_path)
         elif file_ext == '.pdf':
             if fitz is None:
                 raise ImportError("PyMuPDF is not installed. Please run 'pip install PyMuPDF' to process PDF files.")
-            headers, input_rows = read_pdf(file_path)
-        
+            row_iter = iter_pdf(file_path)
+        else:
+            row_iter = iter(())
+        headers = next(row_iter, [])
+
         run_context = {}
+        run_cache = {}
         deidentified_rows = []
+        pattern_set = build_pattern_set(patterns, mask_configs)
         summary = {"rows_processed": 0, "matches": {key: 0 for key in PII_HANDLERS}}
-        
-        for row in input_rows:
-            deid_row, row_counts = detect_and_deidentify_record(row, patterns, mask_configs, context=run_context)
+
+        for row in row_iter:
+            deid_row, row_counts = detect_and_deidentify_record(row, patterns, mask_configs, context=run_context, pattern_set=pattern_set, cache=run_cache)
             deidentified_rows.append(deid_row)
             summary["rows_processed"] += 1
             for key in summary["matches"]:
@@ -63,63 +68,32 @@ def process_file(file_path, patterns, mask_configs, expected_counts):
     except Exception as e:
         return {'success': False, 'error': str(e)}
 
-def read_csv(file_path):
-    with open(file_path, newline="", encoding="utf-8-sig") as f:
+READ_BUFFER_BYTES = 1 << 20
+
+def iter_csv(file_path):
+    """Yields the header row first, then data rows lazily so only one row is alive at a time."""
+    with open(file_path, newline="", encoding="utf-8-sig", buffering=READ_BUFFER_BYTES) as f:
         reader = csv.reader(f)
-        headers = next(reader, [])
-        rows = list(reader)
-    return headers, rows
-
-def read_txt(file_path):
-    with open(file_path, "r", encoding="utf-8") as f:
-        rows = [[line.strip()] for line in f]
-    return ["Text"], rows
-
-def read_pdf(file_path):
-    rows = []
-    doc = fitz.open(file_path)
-    for page in doc:
-        for line in page.get_text().splitlines():
-            if line.strip():
-                rows.append([line.strip()])
-    return ["Extracted Text"], rows
-
-def calculate_metrics(summary, expected_counts):
-    metrics = {}
-    for key in PII_HANDLERS.keys():
-        found = summary['matches'].get(key, 0)
-        expected = expected_counts.get(key, None)
-        tp = min(found, expected) if expected is not None else found
-        fp = max(0, found - expected) if expected is not None else 0
-        fn = max(0, expected - found) if expected is not None else 0
-        precision = tp / (tp + fp) if (tp + fp) > 0 else 0.0
-        recall = tp / (tp + fn) if (tp + fn) > 0 else 0.0
-        f1 = 2 * (precision * recall) / (precision + recall) if (precision + recall) > 0 else 0.0
-        
-        risk_level = "N/A"
-        if expected is not None:
-            if tp == 0 and fp > 0:
-                risk_level = "Critical"
-            elif tp > 0 and fp == 0:
-                risk_level = "Low"
-            elif precision >= 0.8:
-                risk_level = "Medium"
-            elif precision >= 0.5:
-                risk_level = "High"
-            else:
-                risk_level = "Critical"
-        
-        metrics[key] = {
-            "found": found,
-            "expected": expected,
-            "tp": tp,
-            "fp": fp,
-            "precision": precision,
-            "recall": recall,
-            "f1": f1,
-            "risk": risk_level
-        }
-    return metrics
+        yield next(reader, [])
+        yield from reader
+
+def iter_txt(file_path):
+    yield ["Text"]
+    with open(file_path, "r", encoding="utf-8", buffering=READ_BUFFER_BYTES) as f:
+        for line in f:
+            yield [line.strip()]
+
+def iter_pdf(file_path):
+    yield ["Extracted Text"]
+    with fitz.open(file_path) as doc:
+        for page in doc:
+            # "blocks" skips building one page-wide string; block[4] is the text, block[6] the type (0 = text).
+            for block in page.get_text("blocks"):
+                if block[6] != 0:
+                    continue
+                for line in map(str.strip, block[4].splitlines()):
+                    if line:
+                        yield [line]
 
 @app.route('/')
 def index():
@@ -156,69 +130,74 @@ def upload_file():
         return jsonify({'success': False, 'error': 'No file selected'})
     
     if file and allowed_file(file.filename):
-        filename = secure_filename(file.filename)
-        file_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-        file.save(file_path)
-        
-        # Get configuration from request
-        config = json.loads(request.form.get('config', '{}'))
-        
-        # Process patterns
-        patterns = {}
-        if config.get('use_preset', True):
-            preset_name = config.get('preset', 'Indian (Default)')
-            # Use preset patterns (empty dict means use defaults)
-        else:
-            # Compile custom patterns
-            custom_patterns = config.get('custom_patterns', {})
-            for key, pattern_text in custom_patterns.items():
-                if pattern_text.strip():
-                    try:
-                        patterns[key] = re.compile(pattern_text)
-                    except re.error:
-                        continue
-        
-        # Process mask configurations
-        mask_configs = {}
-        mask_config_data = config.get('mask_configs', {})
-        strategy_map = {
-            "partial": "partial",
-            "full": "full", 
-            "hash": "hash",
-            "encrypt": "encrypt",
-            "redact": "redact"
-        }
-        
-        for key in PII_HANDLERS.keys():
-            key_config = mask_config_data.get(key, {})
-            mask_configs[key] = {
-                'enabled': key_config.get('enabled', True),
-                'strategy': strategy_map.get(key_config.get('strategy', 'partial'), 'partial'),
-                'char': key_config.get('char', '*')
-            }
-        
-        # Process expected counts
-        expected_counts = {}
-        expected_data = config.get('expected_counts', {})
-        for key, value in expected_data.items():
-            if value and str(value).isdigit():
-                expected_counts[key] = int(value)
-            else:
-                expected_counts[key] = None
-        
-        # Process the file
-        result = process_file(file_path, patterns, mask_configs, expected_counts)
-        
-        # Clean up uploaded file
+        # NamedTemporaryFile gives a collision-free name per request; keep the
+        # extension since process_file dispatches on it.
+        suffix = os.path.splitext(secure_filename(file.filename))[1].lower()
+        tmp = tempfile.NamedTemporaryFile(suffix=suffix, dir=app.config['UPLOAD_FOLDER'], delete=False)
         try:
-            os.remove(file_path)
-        except:
-            pass
-        
-        return jsonify(result)
-    
+            file.save(tmp)
+            tmp.close()
+            return jsonify(_handle_upload(tmp.name))
+        finally:
+            tmp.close()
+            try:
+                os.unlink(tmp.name)
+            except OSError:
+                pass
+
     return jsonify({'success': False, 'error': 'Invalid file type'})
 
+def _handle_upload(file_path):
+    # Get configuration from request
+    config = json.loads(request.form.get('config', '{}'))
+    
+    # Process patterns
+    patterns = {}
+    if config.get('use_preset', True):
+        preset_name = config.get('preset', 'Indian (Default)')
+        patterns = get_compiled_preset(preset_name)
+    else:
+        # Compile custom patterns (cached, so repeated uploads reuse compiled objects)
+        custom_patterns = config.get('custom_patterns', {})
+        for key, pattern_text in custom_patterns.items():
+            if pattern_text.strip():
+                try:
+                    # PII tokens are ASCII; re.ASCII keeps \d/\w/\b out of the Unicode tables.
+                    patterns[key] = compile_pattern(pattern_text, re.ASCII)
+                except re.error:
+                    continue
+    
+    # Process mask configurations
+    mask_configs = {}
+    mask_config_data = config.get('mask_configs', {})
+    strategy_map = {
+        "partial": "partial",
+        "full": "full", 
+        "hash": "hash",
+        "encrypt": "encrypt",
+        "redact": "redact"
+    }
+    
+    for key in PII_HANDLERS.keys():
+        key_config = mask_config_data.get(key, {})
+        mask_configs[key] = {
+            'enabled': key_config.get('enabled', True),
+            'strategy': strategy_map.get(key_config.get('strategy', 'partial'), 'partial'),
+            'char': key_config.get('char', '*')
+        }
+    
+    # Process expected counts
+    expected_counts = {}
+    expected_data = config.get('expected_counts', {})
+    for key, value in expected_data.items():
+        if value and str(value).isdigit():
+            expected_counts[key] = int(value)
+        else:
+            expected_counts[key] = None
+    
+    # Process the file
+    return process_file(file_path, patterns, mask_configs, expected_counts)
+
 @app.route('/api/download/<data_type>')
 def download_data(data_type):
     # This would need to be implemented with session storage or database
@@ -226,4 +205,8 @@ def download_data(data_type):
     return jsonify({'success': False, 'error': 'Download functionality requires session storage'})
 
 if __name__ == '__main__':
-    app.run(debug=True, host='0.0.0.0', port=5000)
+    # Development server only; the debug reloader and single-threaded handling
+    # serialize concurrent uploads. In production run e.g.:
+    #   gunicorn --workers 4 --threads 2 --bind 0.0.0.0:5000 web_app:app
+    debug = os.environ.get('FLASK_DEBUG', '').lower() in ('1', 'true')
+    app.run(debug=debug, host='0.0.0.0', port=5000, threaded=True)